@@ -0,0 +1,17 @@
+"""
+Automated Industry Detection For Sunnyvale Chamber of Commerce, as an importable package.
+
+The pipeline is split into stages, each in its own module and each runnable on its own from the command line
+(python -m industryDetection <stage>):
+    - crawl: asks Bing for every business type in a grid over Sunnyvale (crawl.py).
+    - parse: turns the raw responses into BusinessList.csv (transform.py).
+    - dedupe: combines duplicate businesses into CleanedBusinessList (dedupe.py).
+    - tiles: bins the businesses into per-cell density tiles (densityTiles.py).
+    - enrich: looks the Chamber spreadsheet up on Google Places (enrich.py).
+    - report: renders the charts (report.py).
+    - store: upserts the businesses into an embedded SQLite store (store.py).
+    - serve: answers radius, box and nearest queries over the businesses (query.py).
+
+Importing the package or any stage has no side effects, and pandas, numpy, pyarrow, matplotlib and aiohttp are
+only imported once a stage actually needs them.
+"""
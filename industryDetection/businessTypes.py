@@ -0,0 +1,23 @@
+"""
+All possible types from the Bing Maps API, separated into 7 big categories, EatDrink, SeeDo, Shop,
+BanksAndCreditUnions, Hospitals, HotelsAndMotels, and Parking.
+"""
+
+eatDrinkTypes = ["Bars", "BarsGrillsAndPubs", "BelgianRestaurants", "BreweriesAndBrewPubs", "BritishRestaurants", "BuffetRestaurants", "CafeRestaurants", "CaribbeanRestaurants", "ChineseRestaurants", "CocktailLounges", "CoffeeAndTea", "Delicatessens", "DeliveryService", "Diners", "DiscountStores", "Donuts", "FastFood", "FrenchRestaurants", "FrozenYogurt", "GermanRestaurants", "GreekRestaurants", "Grocers", "Grocery", "HawaiianRestaurants", "HungarianRestaurants", "IceCreamAndFrozenDesserts", "IndianRestaurants", "ItalianRestaurants", "JapaneseRestaurants", "Juices", "KoreanRestaurants", "LiquorStores", "MexicanRestaurants", "MiddleEasternRestaurants", "Pizza", "PolishRestaurants", "PortugueseRestaurants", "Pretzels", "Restaurants", "RussianAndUkrainianRestaurants", "Sandwiches", "SeafoodRestaurants", "SpanishRestaurants", "SportsBars", "SteakHouseRestaurants", "Supermarkets", "SushiRestaurants", "TakeAway", "Taverns", "ThaiRestaurants", "TurkishRestaurants", "VegetarianAndVeganRestaurants", "VietnameseRestaurants"]
+seeDoTypes = ["AmusementParks", "Attractions", "Carnivals", "Casinos", "LandmarksAndHistoricalSites", "MiniatureGolfCourses", "MovieTheaters", "Museums", "Parks", "SightseeingTours", "TouristInformation", "Zoos"]
+shopTypes = ["AntiqueStores", "Bookstores", "CDAndRecordStores", "ChildrensClothingStores", "CigarAndTobaccoShops", "ComicBookStores", "DepartmentStores", "DiscountStores", "FleaMarketsAndBazaars", "FurnitureStores", "HomeImprovementStores", "JewelryAndWatchesStores", "KitchenwareStores", "LiquorStores", "MallsAndShoppingCenters", "MensClothingStores", "MusicStores", "OutletStores", "PetShops", "PetSupplyStores", "SchoolAndOfficeSupplyStores", "ShoeStores", "SportingGoodsStores", "ToyyAndGameStores", "VitaminAndSupplementStores", "WomensClothingStores"]
+#The last four categories are types of their own.
+otherTypes = ["BanksAndCreditUnions", "Hospitals", "HotelsAndMotels", "Parking"]
+
+#DiscountStores and LiquorStores are both EatDrink and Shop types, but only need to be crawled once.
+totalTypes = list(dict.fromkeys(eatDrinkTypes + seeDoTypes + shopTypes + otherTypes))
+
+
+def getOverallType(bizType):
+    if bizType in eatDrinkTypes:
+        return "EatDrink"
+    elif bizType in seeDoTypes:
+        return "SeeDo"
+    elif bizType in shopTypes:
+        return "Shop"
+    return bizType
@@ -0,0 +1,132 @@
+"""
+Command line entry point, one subcommand per stage. Every stage imports only what it needs, so e.g. parse and
+report never touch the network and never load aiohttp.
+"""
+
+import argparse
+import math
+import sys
+
+
+def buildParser():
+    parser = argparse.ArgumentParser(prog="python -m industryDetection", description="Automated Industry Detection For Sunnyvale Chamber of Commerce")
+    stages = parser.add_subparsers(dest="stage", required=True)
+    
+    crawlParser = stages.add_parser("crawl", help="ask Bing for every business type in the grid over Sunnyvale")
+    crawlParser.add_argument("--results", default="ResultsList.txt", help="where the raw responses are saved")
+    crawlParser.add_argument("--grid", choices=("rect", "hex"), default="rect", help="8x5 rectangles, or circles on a hexagonal lattice")
+    crawlParser.add_argument("--radius", type=float, default=1500, help="circle radius in meters for --grid hex")
+    crawlParser.add_argument("--tiles", default=None, help="DensityTiles.npz of a previous crawl, sizes the circles of every type by its density (needs --grid hex)")
+    crawlParser.add_argument("--region", nargs=5, action="append", metavar=("NAME", "SW_LAT", "SW_LNG", "NE_LAT", "NE_LNG"), help="crawl this box instead of Sunnyvale, can be given more than once (overlapping boxes are each crawled in full, only identical cells are requested once)")
+    crawlParser.add_argument("--dry-run", action="store_true", help="only print the number of requests, runtime and quota share of the plan")
+    crawlParser.add_argument("--store", default=None, help="also upsert the responses and businesses into this SQLite store")
+    
+    parseParser = stages.add_parser("parse", help="turn the raw responses into BusinessList.csv")
+    parseParser.add_argument("--results", default="ResultsList.txt")
+    parseParser.add_argument("--csv", default="BusinessList.csv")
+    parseParser.add_argument("--workers", type=int, default=1, help="processes to parse with, 0 for every core")
+    
+    dedupeParser = stages.add_parser("dedupe", help="combine duplicate businesses into CleanedBusinessList")
+    dedupeParser.add_argument("--csv", default="BusinessList.csv")
+    dedupeParser.add_argument("--cleaned", default="CleanedBusinessList.csv")
+    dedupeParser.add_argument("--dataset", default="CleanedBusinessList")
+    dedupeParser.add_argument("--results", default="ResultsList.txt", help="its modification date is used as the crawl date, or the one of --csv if it does not exist")
+    dedupeParser.add_argument("--crawl-date", default=None, help="YYYY-MM-DD date to file the crawl under instead")
+    
+    tilesParser = stages.add_parser("tiles", help="bin the businesses into per-cell density tiles")
+    tilesParser.add_argument("--dataset", default="CleanedBusinessList", help="CleanedBusinessList dataset, or a Businesses.sqlite store to read the newest crawl from")
+    tilesParser.add_argument("--tiles", default="DensityTiles.npz")
+    tilesParser.add_argument("--zoom", type=int, default=3, help="number of zoom levels")
+    
+    enrichParser = stages.add_parser("enrich", help="look the Chamber spreadsheet up on Google Places")
+    enrichParser.add_argument("--chamber", default="SVChamberofCommerce-Non-HomeBasedbusinesses.csv")
+    enrichParser.add_argument("--output", default="SVChamberofCommerce-Non-HomeBasedbusinessesSearched.csv")
+    enrichParser.add_argument("--api-key", default="api_key.txt", help="text file holding the Google Places API key")
+    enrichParser.add_argument("--dataset", default="CleanedBusinessList", help="deduplicated Bing results (or a Businesses.sqlite store) to fill matching businesses in from, skipped if it does not exist")
+    enrichParser.add_argument("--no-bing", action="store_true", help="search every business on Google without matching against the Bing results")
+    enrichParser.add_argument("--hedge-delay", type=float, default=None, help="seconds before speculatively starting the next fallback search, 0 to start them all at once")
+    enrichParser.add_argument("--max-hedges", type=int, default=2, help="most speculative searches per business")
+    enrichParser.add_argument("--store", default=None, help="SQLite store to reuse and upsert the enrichments in")
+    
+    reportParser = stages.add_parser("report", help="render every chart headlessly to PNG/SVG")
+    reportParser.add_argument("--dataset", default="CleanedBusinessList", help="CleanedBusinessList dataset, or a Businesses.sqlite store to read the newest crawl from")
+    reportParser.add_argument("--output-dir", default=".")
+    reportParser.add_argument("--format", nargs="+", default=["png"], choices=("png", "svg"), help="one file per chart for every format")
+    reportParser.add_argument("--workers", type=int, default=None, help="processes to draw with, one per chart by default")
+    
+    storeParser = stages.add_parser("store", help="upsert the businesses of a ResultsList.txt into the SQLite store")
+    storeParser.add_argument("--results", default="ResultsList.txt")
+    storeParser.add_argument("--store", default="Businesses.sqlite")
+    
+    serveParser = stages.add_parser("serve", help="answer radius, box and nearest queries over HTTP")
+    serveParser.add_argument("--dataset", default="CleanedBusinessList", help="CleanedBusinessList dataset, or a Businesses.sqlite store to read the newest crawl from")
+    serveParser.add_argument("--host", default="127.0.0.1")
+    serveParser.add_argument("--port", type=int, default=8080)
+    
+    return parser
+
+
+def main(argv=None):
+    parser = buildParser()
+    args = parser.parse_args(argv)
+    
+    if args.stage == "crawl":
+        import asyncio
+        from .plan import compilePlan, defaultRegions, printPlan
+        regions = defaultRegions
+        if args.region:
+            regions = {name: ((float(swLat), float(swLng)), (float(neLat), float(neLng))) for name, swLat, swLng, neLat, neLng in args.region}
+        if not (math.isfinite(args.radius) and args.radius > 0):
+            parser.error("--radius must be a positive number of meters")
+        if args.tiles and args.grid != "hex":
+            parser.error("--tiles sizes the circles of --grid hex, it cannot be used with --grid rect")
+        densityTiles = None
+        if args.tiles:
+            from .densityTiles import loadDensityTiles
+            densityTiles = loadDensityTiles(args.tiles)
+        try:
+            jobs = compilePlan(regions, grid=args.grid, radius=args.radius, densityTiles=densityTiles)
+        except ValueError as error:
+            parser.error(str(error))
+        printPlan(jobs)
+        if args.dry_run:
+            return
+        
+        from .crawl import crawl
+        try:
+            responses = asyncio.run(crawl(args.results, jobs, storePath=args.store))
+        except RuntimeError as error:
+            sys.exit(str(error))
+        print(str(responses) + " responses saved to " + args.results)
+    elif args.stage == "parse":
+        from .transform import transform, parallelTransform
+        if args.workers == 1:
+            transform(args.results, args.csv)
+        else:
+            parallelTransform(args.results, args.csv, args.workers or None)
+        print("Saved " + args.csv)
+    elif args.stage == "dedupe":
+        from .dedupe import dedupe
+        df = dedupe(args.csv, args.cleaned, args.dataset, args.results, args.crawl_date)
+        print(str(len(df)) + " businesses saved to " + args.cleaned + " and " + args.dataset)
+    elif args.stage == "tiles":
+        from .densityTiles import writeDensityTiles
+        writeDensityTiles(args.dataset, args.tiles, args.zoom)
+        print("Saved " + args.tiles)
+    elif args.stage == "enrich":
+        import asyncio
+        from .enrich import enrich
+        asyncio.run(enrich(args.chamber, args.output, args.api_key, None if args.no_bing else args.dataset, args.hedge_delay, args.max_hedges, args.store))
+        print("Saved " + args.output)
+    elif args.stage == "report":
+        from .report import report
+        for path in report(args.dataset, args.output_dir, args.format, args.workers):
+            print("Saved " + path)
+    elif args.stage == "store":
+        from .store import BusinessStore
+        with BusinessStore(args.store) as store:
+            businesses = store.importResults(args.results)
+        print(str(businesses) + " businesses upserted into " + args.store)
+    elif args.stage == "serve":
+        from .query import serve
+        serve(args.dataset, args.host, args.port)
@@ -0,0 +1,133 @@
+"""
+Crawl stage: asks Bing for every type inside every cell of a grid over the meta bounding box, or inside every
+circle of a hexagonal covering of it, and writes the raw responses to ResultsList.txt, one
+{JSON_RESULT}|BusinessType line per response.
+"""
+
+import math
+import os
+
+from .businessTypes import totalTypes
+from .fetchEngine import FetchEngine, BingLocalSearch
+
+bingKey = "AnGrJg9HJRSEcDeyPbI2cBJ1X2CZLmJLKY6I026rbIFlo4hxas9bTDwKwt9rCV5A"
+
+#Location of the box is a comma separated list of the latitudes and longitudes of two corners of the rectangle, in the following order:
+    #- Latitude of the Southwest corner
+    #- Longitude of the Southwest corner
+    #- Latitude of the Northeast corner
+    #- Longitude of the Northeast corner
+    #Example: 29.8171041,-122.981995,48.604311,-95.5413725
+metaBoundingBoxSW = [37.33190189447495, -122.072770090548]
+metaBoundingBoxNE = [37.448793480573976, -121.97427447581298]
+
+#5 columns by 8 rows is the default, but those were just arbitrarity chosen numbers.
+#As long as the proportions are correct (around 5x8), that is all that matters.
+LAT_divisor = 8
+LNG_divisor = 5
+
+
+def boxCreation(SW, NE, LAT_divisor, LNG_divisor):
+    from numpy import arange
+
+    distLAT = NE[0] - SW[0]
+    distLNG = NE[1] - SW[1]
+    LATmult = distLAT / LAT_divisor
+    LNGmult = distLNG / LNG_divisor
+    
+    for lat in arange(SW[0], NE[0], LATmult):
+        for lng in arange(SW[1], NE[1], LNGmult):
+            yield ((lat, lng), (lat + LATmult, lng + LNGmult))
+
+
+def crawlJobs(types=totalTypes, SW=metaBoundingBoxSW, NE=metaBoundingBoxNE, LAT_divisor=LAT_divisor, LNG_divisor=LNG_divisor):
+    jobs = []
+    for bizType in types:
+        for boxSW, boxNE in boxCreation(SW, NE, LAT_divisor, LNG_divisor):
+            stringifiedQuery = str(boxSW[0])+","+str(boxSW[1])+","+str(boxNE[0])+","+str(boxNE[1])
+            jobs.append((bizType, stringifiedQuery))
+    return jobs
+
+
+#Rectangles used as Bing viewports have poorly defined edges and overlap heavily. The circular mode covers the
+#meta bounding box with circles instead, sent as userCircularMapView requests. The circle centers sit on a hexagonal
+#lattice (rows 1.5 radii apart, centers sqrt(3) radii apart, every other row shifted by half), which is the
+#covering with the least overlap for a given radius.
+
+metersPerDegreeLAT = 111320
+#Bing returns at most 25 results, so a circle should expect a bit less than that to not miss anything.
+circleFill = 0.8
+
+
+def hexCenters(SW, NE, radius):
+    metersPerDegreeLNG = metersPerDegreeLAT * math.cos(math.radians((SW[0] + NE[0]) / 2))
+    rowStep = 1.5 * radius / metersPerDegreeLAT
+    columnStep = math.sqrt(3) * radius / metersPerDegreeLNG
+    
+    rows = math.ceil((NE[0] - SW[0]) / rowStep) + 1
+    for row in range(rows):
+        lat = SW[0] + row * rowStep
+        offset = columnStep / 2 if row % 2 else 0
+        columns = math.ceil((NE[1] - SW[1] + offset) / columnStep) + 1
+        for column in range(columns):
+            yield (lat, SW[1] - offset + column * columnStep)
+
+
+def densityRadius(densityTiles, bizType, minRadius=250, maxRadius=2000):
+    #Sizes the circles so the densest cell of the last crawl would still fill only circleFill of the 25 results.
+    #densityTiles is what industryDetection.densityTiles.loadDensityTiles returns.
+    if bizType not in densityTiles["types"]:
+        return maxRadius
+    counts = densityTiles["zoom"][0]["typeCounts"][:, :, densityTiles["types"].index(bizType)]
+    
+    SW, NE = densityTiles["SW"], densityTiles["NE"]
+    rows, columns = counts.shape
+    cellArea = ((NE[0] - SW[0]) / rows * metersPerDegreeLAT) * ((NE[1] - SW[1]) / columns * metersPerDegreeLAT * math.cos(math.radians((SW[0] + NE[0]) / 2)))
+    density = counts.max() / cellArea
+    if density == 0:
+        return maxRadius
+    return min(maxRadius, max(minRadius, math.sqrt(circleFill * 25 / (math.pi * density))))
+
+
+def circularJobs(types=totalTypes, SW=metaBoundingBoxSW, NE=metaBoundingBoxNE, radius=1500, densityTiles=None):
+    if densityTiles is None and not (math.isfinite(radius) and radius > 0):
+        raise ValueError("radius must be a positive number of meters")
+    jobs = []
+    for bizType in types:
+        typeRadius = densityRadius(densityTiles, bizType) if densityTiles is not None else radius
+        for lat, lng in hexCenters(SW, NE, typeRadius):
+            jobs.append((bizType, str(lat)+","+str(lng)+","+str(round(typeRadius)), "userCircularMapView"))
+    return jobs
+
+
+async def crawl(resultsPath='ResultsList.txt', jobs=None, key=bingKey, storePath=None):
+    #jobs is usually a plan from industryDetection.plan.compilePlan, defaulting to the 8x5 grid over Sunnyvale.
+    #With storePath, the responses and their businesses are also upserted into that BusinessStore.
+    if jobs is None:
+        jobs = crawlJobs()
+    if not jobs:
+        #Nothing to ask for would otherwise replace the previous ResultsList.txt with an empty file.
+        raise ValueError("there are no requests to crawl")
+    
+    async with FetchEngine() as engine:
+        results = await engine.fetchAll(BingLocalSearch(key), jobs)
+    
+    #Written next to the old results first, so a crawl that fails halfway never clobbers the previous ResultsList.txt.
+    with open(resultsPath + ".tmp", "w", encoding="utf-8") as newFile:
+        for outcome, line in results:
+            if outcome == "ok":
+                newFile.write(line + "\n")
+    
+    #A request that still failed after its retries would leave a hole in the results, so nothing is replaced or
+    #upserted, and the partial results are left in the .tmp file to look at.
+    errors = sum(outcome == "error" for outcome, line in results)
+    if errors:
+        raise RuntimeError(str(errors) + " of " + str(len(results)) + " requests failed, " + resultsPath + " was left as it was and the partial results are in " + resultsPath + ".tmp")
+    
+    if storePath:
+        from .store import BusinessStore
+        with BusinessStore(storePath) as store:
+            store.upsertCrawl(jobs, results)
+    os.replace(resultsPath + ".tmp", resultsPath)
+    
+    return sum(outcome == "ok" for outcome, line in results)
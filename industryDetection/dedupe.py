@@ -0,0 +1,88 @@
+"""
+Dedupe stage: combines every business that was found under several types into one row, and writes the result
+as CleanedBusinessList.csv and as the CleanedBusinessList Parquet dataset.
+
+The Parquet dataset has an explicit schema and is partitioned by Overall Type and by the day the crawl was taken,
+the crawl date being when ResultsList.txt was last written (or BusinessList.csv, if there is no ResultsList.txt), so
+reprocessing an old archive keeps its original date. crawlDate can also be given outright.
+"""
+
+import glob
+import os
+import shutil
+from datetime import date
+
+cleanedColumns = ['Overall Type', 'Type', 'Name', 'Address', 'Phone Number', 'Website', 'Latitude', 'Longitude']
+
+
+def businessSchema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("Overall Type", pa.string()),
+        ("Type", pa.string()),
+        ("Name", pa.string()),
+        ("Address", pa.string()),
+        ("Phone Number", pa.string()),
+        ("Website", pa.string()),
+        ("Latitude", pa.float64()),
+        ("Longitude", pa.float64()),
+        ("Crawl Date", pa.string())
+    ])
+
+
+def businessPartitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([("Overall Type", pa.string()), ("Crawl Date", pa.string())]), flavor="hive")
+
+
+def dedupe(csvPath='BusinessList.csv', cleanedPath='CleanedBusinessList.csv', datasetPath='CleanedBusinessList', resultsPath='ResultsList.txt', crawlDate=None):
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    #Everything upstream is written as UTF-8, so accented names come through untouched.
+    df = pd.read_csv(csvPath, encoding="utf-8", dtype={'Overall Type': str, 'Type': str, 'Name': str, 'Address': str, 'Phone Number': str, 'Website': str})
+    #If the same business appears multiple times, combine all of the types together.
+    df = df.groupby(['Overall Type','Name','Address', 'Phone Number', 'Website', 'Latitude', 'Longitude'])['Type'].apply(', '.join).reset_index()
+    #Reordering the columns as "Type" would be at the end.
+    df = df[cleanedColumns]
+    #If the Type associated with a business is repeated, remove one but keep the other.
+    df['Type'] = df['Type'].str.split(', ').apply(set).str.join(', ')
+    
+    df.to_csv(cleanedPath, index=False)
+    
+    if crawlDate is None:
+        #Rebuilding from an archived BusinessList.csv without its ResultsList.txt dates the crawl by the CSV instead.
+        crawlDate = date.fromtimestamp(os.path.getmtime(resultsPath if os.path.exists(resultsPath) else csvPath)).isoformat()
+    else:
+        #Also the name of a directory, so only a real YYYY-MM-DD date is accepted.
+        crawlDate = date.fromisoformat(crawlDate).isoformat()
+    table =pa.Table.from_pandas(df.assign(**{'Crawl Date': crawlDate}), schema=businessSchema(), preserve_index=False)
+    #Re-running the same crawl replaces every partition of its date, including the overall types the new run did not
+    #find any businesses for, instead of stacking a second copy on top or leaving stale rows behind.
+    for partition in glob.glob(os.path.join(glob.escape(datasetPath), "Overall Type=*", "Crawl Date=" + crawlDate)):
+        shutil.rmtree(partition)
+    ds.write_dataset(table, datasetPath, format="parquet", partitioning=businessPartitioning(), existing_data_behavior="overwrite_or_ignore")
+    
+    return df
+
+
+def loadBusinesses(columns, crawlDate=None, path='CleanedBusinessList'):
+    #Only the requested columns are read off disk. Defaults to the newest crawl, as every crawl has its own partition.
+    #path can also be a BusinessStore file, which is read as its newest crawl.
+    import pyarrow.dataset as ds
+
+    if os.path.isfile(path):
+        from .store import BusinessStore
+        if crawlDate is not None:
+            raise ValueError("a BusinessStore only tells its newest crawl apart, crawlDate cannot be used with it")
+        with BusinessStore(path) as store:
+            return store.businessTable(newestCrawl=True)[columns]
+
+    dataset = ds.dataset(path, format="parquet", partitioning=businessPartitioning())
+    if crawlDate is None:
+        crawlDate = max(dataset.to_table(columns=['Crawl Date'])['Crawl Date'].to_pylist())
+    return dataset.to_table(columns=columns, filter=ds.field('Crawl Date') == crawlDate).to_pandas()
@@ -0,0 +1,108 @@
+"""
+Bins the deduplicated businesses into the same grid the crawl used, so the clusters can be found and not just the
+citywide counts. Zoom level 0 is the 8 rows by 5 columns crawl grid, and every zoom level after that splits each cell
+into four. For every zoom level two count cubes are built:
+    - typeCounts[row, column, type], counting each business once for every type it was listed under.
+    - overallCounts[row, column, overall type], counting each business once.
+
+A heatmap for a type, or the breakdown of a single neighborhood cell, is then just an array lookup. The cubes are
+saved to DensityTiles.npz so they can be reloaded without the business table.
+"""
+
+import math
+
+from .crawl import metaBoundingBoxSW, metaBoundingBoxNE, LAT_divisor, LNG_divisor
+from .dedupe import loadBusinesses
+
+
+def buildDensityTiles(df, SW, NE, LAT_divisor, LNG_divisor, zoomLevels=3):
+    import numpy as np
+
+    #Businesses that could not be mapped sit at (0, 0) and anything outside the meta bounding box is dropped.
+    inside = df['Latitude'].between(SW[0], NE[0], inclusive="left") & df['Longitude'].between(SW[1], NE[1], inclusive="left")
+    df = df[inside]
+    
+    overallTypes = sorted(df['Overall Type'].unique())
+    overallIndex = df['Overall Type'].map({overall: index for index, overall in enumerate(overallTypes)}).to_numpy()
+    
+    #A business listed under several types gets one row per type.
+    typeRows = df['Type'].str.split(', ').explode()
+    types = sorted(typeRows.unique())
+    typeIndex = typeRows.map({bizType: index for index, bizType in enumerate(types)}).to_numpy()
+    typeOwner = df.index.get_indexer(typeRows.index)
+    
+    tiles = {}
+    for zoom in range(zoomLevels):
+        rows = LAT_divisor * 2 ** zoom
+        columns = LNG_divisor * 2 ** zoom
+        row = np.minimum(((df['Latitude'].to_numpy() - SW[0]) / (NE[0] - SW[0]) * rows).astype(int), rows - 1)
+        column = np.minimum(((df['Longitude'].to_numpy() - SW[1]) / (NE[1] - SW[1]) * columns).astype(int), columns - 1)
+        
+        overallCounts = np.zeros((rows, columns, len(overallTypes)), dtype=np.int32)
+        np.add.at(overallCounts, (row, column, overallIndex), 1)
+        typeCounts = np.zeros((rows, columns, len(types)), dtype=np.int32)
+        np.add.at(typeCounts, (row[typeOwner], column[typeOwner], typeIndex), 1)
+        
+        tiles[zoom] = {"typeCounts": typeCounts, "overallCounts": overallCounts}
+    
+    return {"SW": SW, "NE": NE, "types": types, "overallTypes": overallTypes, "zoom": tiles}
+
+
+def tileHeatmap(densityTiles, bizType, zoom=0):
+    import numpy as np
+
+    #Works for both a type (e.g. "CoffeeAndTea") and an overall type (e.g. "EatDrink"), returns a rows by columns array.
+    tiles = densityTiles["zoom"][zoom]
+    if bizType in densityTiles["overallTypes"]:
+        return tiles["overallCounts"][:, :, densityTiles["overallTypes"].index(bizType)]
+    if bizType in densityTiles["types"]:
+        return tiles["typeCounts"][:, :, densityTiles["types"].index(bizType)]
+    return np.zeros(tiles["overallCounts"].shape[:2], dtype=np.int32)
+
+
+def tileBreakdown(densityTiles, lat, lng, zoom=0):
+    #Counts per overall type and per type for the cell the point falls in.
+    tiles = densityTiles["zoom"][zoom]
+    SW, NE = densityTiles["SW"], densityTiles["NE"]
+    #Same box as buildDensityTiles, so a point outside it is an error and never wraps around to the other side.
+    if not (SW[0] <= lat < NE[0] and SW[1] <= lng < NE[1]):
+        raise ValueError("(" + str(lat) + ", " + str(lng) + ") is outside the density tiles")
+    rows, columns = tiles["overallCounts"].shape[:2]
+    row = min(math.floor((lat - SW[0]) / (NE[0] - SW[0]) * rows), rows - 1)
+    column = min(math.floor((lng - SW[1]) / (NE[1] - SW[1]) * columns), columns - 1)
+    
+    overall = dict(zip(densityTiles["overallTypes"], tiles["overallCounts"][row, column].tolist()))
+    types = {bizType: count for bizType, count in zip(densityTiles["types"], tiles["typeCounts"][row, column].tolist()) if count}
+    return overall, types
+
+
+def saveDensityTiles(densityTiles, path='DensityTiles.npz'):
+    import numpy as np
+
+    arrays = {}
+    for zoom, tiles in densityTiles["zoom"].items():
+        arrays["typeCounts" + str(zoom)] = tiles["typeCounts"]
+        arrays["overallCounts" + str(zoom)] = tiles["overallCounts"]
+    np.savez_compressed(path, SW=densityTiles["SW"], NE=densityTiles["NE"], types=densityTiles["types"], overallTypes=densityTiles["overallTypes"], **arrays)
+
+
+def loadDensityTiles(path='DensityTiles.npz'):
+    import numpy as np
+
+    with np.load(path) as saved:
+        zoomLevels = len([name for name in saved.files if name.startswith("overallCounts")])
+        return {
+            "SW": saved["SW"].tolist(),
+            "NE": saved["NE"].tolist(),
+            "types": saved["types"].tolist(),
+            "overallTypes": saved["overallTypes"].tolist(),
+            "zoom": {zoom: {"typeCounts": saved["typeCounts" + str(zoom)], "overallCounts": saved["overallCounts" + str(zoom)]} for zoom in range(zoomLevels)}
+        }
+
+
+def writeDensityTiles(datasetPath='CleanedBusinessList', tilesPath='DensityTiles.npz', zoomLevels=3):
+    #Same meta bounding box and 8x5 grid as the crawl.
+    df = loadBusinesses(['Overall Type', 'Type', 'Latitude', 'Longitude'], path=datasetPath)
+    tiles = buildDensityTiles(df, metaBoundingBoxSW, metaBoundingBoxNE, LAT_divisor, LNG_divisor, zoomLevels)
+    saveDensityTiles(tiles, tilesPath)
+    return tiles
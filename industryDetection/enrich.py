@@ -0,0 +1,174 @@
+"""
+Enrich stage: looks up every business of the Chamber spreadsheet on Google Places and writes the spreadsheet back
+out with the Google Place ID, name, types and coordinates appended. Businesses the Bing crawl already found are
+filled in from it instead (see linkage), when there is a deduplicated crawl to match against.
+
+The only prerequisite is a Google Places API Key, stored in a text file titled api_key.txt.
+"""
+
+import asyncio
+import csv
+import os
+
+from .dedupe import loadBusinesses
+from .fetchEngine import FetchEngine, GooglePlaces
+from .linkage import linkToBing
+
+
+async def placeReq(engine, provider, extractedAddress, businessName, phoneNumber, searchMethod = "address"):
+    outcome, combinedValue = await engine.fetch(provider, (extractedAddress, businessName, phoneNumber, searchMethod))
+    
+    if outcome == "miss":
+        if searchMethod == "phone":
+            return await placeReq(engine, provider, extractedAddress, businessName, phoneNumber, searchMethod = "name")
+        #CONSIDER REMOVING BELOW ELIF, AS NAME IS EXTREMELY INNACURATE ABOUT EXACT BUSINESS:
+        #Pros: Uses both businessName and extractedAddress, if name/address are related to field, google searching does help with finding company related to it.
+        #Cons: Not guaranteed to have the correct business nor location, only limited to sunnyvale area
+        elif searchMethod == "name":
+            return await placeReq(engine, provider, extractedAddress, businessName, phoneNumber, searchMethod = "address")
+    if outcome != "ok":
+        #Throttling and unknown errors were already retried by the engine.
+        return ""
+    
+    #Place ID, name, types, longitude, latitude
+    return combinedValue
+
+
+async def hedgedPlaceReq(engine, provider, extractedAddress, businessName, phoneNumber, hedgeDelay=0.3, maxHedges=2):
+    #Same answers as placeReq, best-ranked first (phone, then name, then address), but a miss no longer costs one
+    #round trip per fallback. The next search starts as soon as the previous one misses, or speculatively once it has
+    #been running for hedgeDelay seconds, at most maxHedges times per business. Speculative searches are the only extra
+    #cost, and whatever is still running once the answer is known gets cancelled.
+    searchMethods = ["phone", "name", "address"] if phoneNumber != "" else ["address"]
+    searches = []
+    
+    def startSearch():
+        searchMethod = searchMethods[len(searches)]
+        searches.append(asyncio.ensure_future(engine.fetch(provider, (extractedAddress, businessName, phoneNumber, searchMethod))))
+    
+    startSearch()
+    try:
+        while True:
+            for search in searches:
+                if not search.done():
+                    break
+                outcome, combinedValue = search.result()
+                if outcome != "miss":
+                    #Throttling and unknown errors were already retried by the engine.
+                    return combinedValue if outcome == "ok" else ""
+            else:
+                #Everything started so far came back with ZERO_RESULTS.
+                if len(searches) == len(searchMethods):
+                    return ""
+                startSearch()
+                continue
+            
+            canHedge = maxHedges > 0 and len(searches) < len(searchMethods)
+            done, pending = await asyncio.wait([search for search in searches if not search.done()], timeout=hedgeDelay if canHedge else None, return_when=asyncio.FIRST_COMPLETED)
+            if not done and canHedge:
+                maxHedges -= 1
+                startSearch()
+    finally:
+        for search in searches:
+            search.cancel()
+
+
+def readChamberList(chamberPath):
+    with open(chamberPath) as csv_file:
+        totalLines = [row for row in csv.reader(csv_file, delimiter=',')]
+    
+    totalLines[0].append("Google Place ID")
+    totalLines[0].append("Google Place Name")
+    totalLines[0].append("Google Business Types")
+    totalLines[0].append("Longitude")
+    totalLines[0].append("Latitude")
+    return totalLines
+
+
+def writeSearchedList(totalLines, outputPath):
+    with open(outputPath, "w") as output:
+        for rw in totalLines:
+            for index, value in enumerate(rw):
+                value = value.replace("\n", " ")
+                if "," in value:
+                    value = "\"" + value + "\""
+                    if '""' in value:
+                        value = value.replace('""', '"')
+                if index+1 == len(rw):
+                    value = value + "\n "
+                else:
+                    value = value + ","
+                try:
+                    output.write(value)
+                except UnicodeEncodeError:
+                    print("encodingError")
+                    output.write(",")
+
+
+async def enrich(chamberPath='SVChamberofCommerce-Non-HomeBasedbusinesses.csv', outputPath='SVChamberofCommerce-Non-HomeBasedbusinessesSearched.csv', apiKeyPath='api_key.txt', datasetPath='CleanedBusinessList', hedgeDelay=None, maxHedges=2, storePath=None):
+    #Leave hedgeDelay as None to search with placeReq, one fallback after another, or see hedgedPlaceReq.
+    #With storePath, businesses already enriched in that BusinessStore are not searched again, and every new answer
+    #is upserted into it.
+    with open(apiKeyPath, "r") as keyFile:
+        provider = GooglePlaces(keyFile.read())
+    totalLines = readChamberList(chamberPath)
+    
+    #Rows the Bing crawl already found are filled in from it instead of asking Google. Without a dataset (datasetPath
+    #None, or no crawl deduplicated yet) every row is searched on Google, as before the linkage.
+    bingMatches = {}
+    if datasetPath is not None and os.path.exists(datasetPath):
+        bingBusinesses = loadBusinesses(['Type', 'Name', 'Address', 'Phone Number', 'Latitude', 'Longitude'], path=datasetPath)
+        bingMatches = linkToBing(totalLines, bingBusinesses)
+        print(str(len(bingMatches)) + " of " + str(len(totalLines) - 1) + " businesses matched to the Bing results")
+    else:
+        print("No Bing results to match against, searching every business on Google")
+    
+    completedRows = 0
+    
+    async def searchRow(engine, index, row):
+        nonlocal completedRows
+        #Get business info
+        #row is now an array which should be constant indexing
+        address = row[3] + ", " + row[4]
+        #GOOGLE DOESNT ACCEPT PO BOX SEARCHES
+        if index in bingMatches or "PO BOX" not in address:
+            name = row[1]
+            phone = row[6]
+            storedInfo = store.enrichment(name, address, phone) if store else None
+            if storedInfo is not None:
+                businessInfo = storedInfo
+            elif index in bingMatches:
+                #There is no Google Place ID for these, the rest of the columns come from the Bing result.
+                bingRow = bingBusinesses.iloc[bingMatches[index]]
+                businessInfo = ["", bingRow['Name'], "\"" + bingRow['Type'] + "\"", str(bingRow['Longitude']), str(bingRow['Latitude'])]
+            elif hedgeDelay is not None:
+                businessInfo = await hedgedPlaceReq(engine, provider, address, name, phone, hedgeDelay, maxHedges)
+            elif phone == "":
+                businessInfo = await placeReq(engine, provider, address, name, phone)
+            else:
+                businessInfo = await placeReq(engine, provider, address, name, phone, searchMethod = "phone")
+            
+            if businessInfo != "":
+                if store and storedInfo is None:
+                    store.upsertEnrichment(name, address, phone, businessInfo, "bing" if index in bingMatches else "google")
+                #Fully updating the row after all analysis
+                row.extend(businessInfo)
+        
+        completedRows += 1
+        print(str(((completedRows+1)/len(totalLines))*100 ) + "% completed")
+    
+    #The store is opened inside the try, so it is closed whatever goes wrong while searching.
+    store = None
+    try:
+        if storePath:
+            from .store import BusinessStore
+            store = BusinessStore(storePath)
+        #The rows are searched concurrently, the engine keeps Google within GooglePlaces.maxConcurrent and requestsPerSecond.
+        async with FetchEngine() as engine:
+            await asyncio.gather(*[searchRow(engine, index, row) for index, row in enumerate(totalLines) if index != 0])
+    finally:
+        if store:
+            store.close()
+    
+    writeSearchedList(totalLines, outputPath)
+    return totalLines
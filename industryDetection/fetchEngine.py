@@ -0,0 +1,156 @@
+"""
+Both the Bing crawl and the Google enrichment go through the same FetchEngine, so connection pooling,
+rate limiting, retries and the response cache apply to both. Each API is described by a provider object with:
+    - buildRequest(job), turning one job into a URL.
+    - classifyResponse(status, headers, text), returning "ok", "miss" (a valid answer with no results),
+      "retry" or "error".
+    - parseResponse(job, text), turning an "ok" response into the value the rest of the pipeline uses.
+    - maxConcurrent and requestsPerSecond, the quota policy for that API.
+
+Adding a third API only means writing another provider, not another fetch loop.
+"""
+
+import asyncio
+import json
+import urllib.parse
+
+
+class BingLocalSearch:
+    maxConcurrent = 4 #could change to 20 apparently and not get banned, but 5 is the max for bing API
+    requestsPerSecond = 8 #A batch of four requests every half second.
+    annualQuota = 125000 #Free up to this many requests each year.
+    
+    def __init__(self, key):
+        self.key = key
+    
+    def buildRequest(self, job):
+        #Jobs are (bizType, stringifiedQuery), with an optional third element naming the map view, userMapView by default.
+        bizType, stringifiedQuery = job[:2]
+        mapView = job[2] if len(job) > 2 else "userMapView"
+        return "https://dev.virtualearth.net/REST/v1/LocalSearch/?type="+bizType+"&maxresults=25&"+mapView+"="+stringifiedQuery+"&key="+self.key
+    
+    def classifyResponse(self, status, headers, text):
+        #Bing answers a throttled request with an empty result set and this header instead of an error code.
+        if status == 429 or status >= 500 or headers.get("X-MS-BM-WS-INFO") == "1":
+            return "retry"
+        if status != 200:
+            return "error"
+        return "ok"
+    
+    def parseResponse(self, job, text):
+        #Same line structure as always, {JSON_RESULT}|BusinessType
+        return text + "|" + job[0]
+
+
+class GooglePlaces:
+    maxConcurrent = 10
+    requestsPerSecond = 50
+    
+    def __init__(self, key):
+        self.key = key
+    
+    def buildRequest(self, job):
+        extractedAddress, businessName, phoneNumber, searchMethod = job
+        if searchMethod == "address":
+            #If you are only going off of the address
+            searchInput = urllib.parse.quote_plus(extractedAddress)
+            inputType = "textquery"
+        if searchMethod == "name":
+            #HIGHLY NOT RECOMMENDED, AS BUSINESS NAME MIGHT HAVE MORE PRIORITY OVER THE ADDRESS
+            #If you are going off of the name and address
+            searchInput = urllib.parse.quote_plus(extractedAddress) + " " + urllib.parse.quote_plus(businessName)
+            inputType = "textquery"
+        if searchMethod == "phone":
+            #If you are only going off of the phone number
+            if "+" in phoneNumber:
+                searchInput = urllib.parse.quote_plus(phoneNumber)
+            else:
+                searchInput = urllib.parse.quote_plus("+1 " + phoneNumber)
+            inputType = "phonenumber"
+        return "https://maps.googleapis.com/maps/api/place/findplacefromtext/json?input="+searchInput+"&inputtype="+inputType+"&fields=business_status,formatted_address,name,place_id,plus_code,type,geometry&key="+self.key
+    
+    def classifyResponse(self, status, headers, text):
+        if status == 429 or status >= 500:
+            return "retry"
+        try:
+            googleStatus = json.loads(text).get("status")
+        except ValueError:
+            return "error"
+        if googleStatus == "OK":
+            return "ok"
+        if googleStatus == "ZERO_RESULTS":
+            return "miss"
+        if googleStatus in ("OVER_QUERY_LIMIT", "UNKNOWN_ERROR"):
+            return "retry"
+        #INVALID_REQUEST and REQUEST_DENIED will not get better by asking again.
+        print(googleStatus)
+        return "error"
+    
+    def parseResponse(self, job, text):
+        candidate = json.loads(text)["candidates"][0]
+        location = candidate.get("geometry", {}).get("location", {})
+        
+        #Place ID, name, types, longitude, latitude
+        return [candidate["place_id"], candidate["name"], "\"" + ", ".join(candidate.get("types", [])) + "\"", str(location.get("lng", "")), str(location.get("lat", ""))]
+
+
+class FetchEngine:
+    def __init__(self, maxRetries=3):
+        self.maxRetries = maxRetries
+        self.cache = {}
+        self.semaphores = {}
+        self.nextSlot = {}
+    
+    async def __aenter__(self):
+        import aiohttp
+
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=100))
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.session.close()
+    
+    async def waitForSlot(self, provider):
+        #Spaces the requests of each provider out to its requestsPerSecond.
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self.nextSlot.get(provider, now))
+        self.nextSlot[provider] = slot + 1 / provider.requestsPerSecond
+        await asyncio.sleep(slot - now)
+    
+    async def fetch(self, provider, job):
+        #Returns (outcome, parsed result), where the result is None unless the outcome is "ok".
+        import aiohttp
+
+        url = provider.buildRequest(job)
+        if url in self.cache:
+            return self.cache[url]
+        
+        if provider not in self.semaphores:
+            self.semaphores[provider] = asyncio.Semaphore(provider.maxConcurrent)
+        
+        outcome = "error"
+        for attempt in range(self.maxRetries + 1):
+            if attempt:
+                await asyncio.sleep(0.5 * 2 ** attempt)
+            async with self.semaphores[provider]:
+                await self.waitForSlot(provider)
+                try:
+                    async with self.session.get(url) as response:
+                        text = await response.text()
+                        outcome = provider.classifyResponse(response.status, response.headers, text)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    outcome = "retry"
+            if outcome != "retry":
+                break
+        
+        if outcome == "retry":
+            outcome = "error"
+        result = (outcome, provider.parseResponse(job, text) if outcome == "ok" else None)
+        if outcome != "error":
+            self.cache[url] = result
+        return result
+    
+    async def fetchAll(self, provider, jobs):
+        #Results come back in the same order as jobs.
+        return await asyncio.gather(*[self.fetch(provider, job) for job in jobs])
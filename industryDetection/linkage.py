@@ -0,0 +1,114 @@
+"""
+Matches Chamber spreadsheet rows to the Bing results, so businesses the crawl already found are not paid for again
+with a Places call:
+    - A row whose normalized phone number (last 10 digits) matches a Bing business is a match, as long as the names
+      are at least loosely similar. When several Bing businesses share the number the most similar name wins.
+    - Otherwise rows are only compared inside the same block, the street number plus the first word of the street
+      name. Inside a block the names are compared with the character trigram similarity of every Chamber/Bing pair
+      at once, and the best pair above threshold is a match.
+
+Blocking keeps the comparisons close to linear in the number of rows.
+"""
+
+import re
+
+streetAbbreviations = {
+    "street": "st", "avenue": "ave", "boulevard": "blvd", "road": "rd", "drive": "dr", "lane": "ln",
+    "court": "ct", "place": "pl", "expressway": "expy", "parkway": "pkwy", "highway": "hwy",
+    "north": "n", "south": "s", "east": "e", "west": "w"
+}
+
+
+def normalizePhone(phone):
+    digits = re.sub(r"\D", "", str(phone))
+    return digits[-10:] if len(digits) >= 10 else ""
+
+
+def addressTokens(address):
+    return [streetAbbreviations.get(token, token) for token in re.findall(r"[a-z0-9]+", str(address).lower())]
+
+
+def blockKey(address):
+    #"1234 North Mathilda Avenue, Sunnyvale" -> ("1234", "mathilda"), None if there is no street number.
+    tokens = addressTokens(address)
+    if not tokens or not tokens[0].isdigit():
+        return None
+    for token in tokens[1:]:
+        if token not in ("n", "s", "e", "w"):
+            return (tokens[0], token)
+    return None
+
+
+def nameTrigrams(name):
+    #Apostrophes are dropped rather than split on, so "Joe's" and "Joes" have the same trigrams.
+    name = re.sub(r"['\u2019]", "", str(name).lower())
+    name = " " + " ".join(re.findall(r"[a-z0-9]+", name)) + " "
+    return {name[index:index + 3] for index in range(len(name) - 2)}
+
+
+def nameSimilarity(chamberNames, bingNames):
+    #Trigram Jaccard similarity for every Chamber/Bing pair, as a single matrix product.
+    import numpy as np
+
+    chamberGrams = [nameTrigrams(name) for name in chamberNames]
+    bingGrams = [nameTrigrams(name) for name in bingNames]
+    vocabulary = {gram: index for index, gram in enumerate(set().union(*chamberGrams, *bingGrams))}
+    
+    chamberMatrix = np.zeros((len(chamberGrams), len(vocabulary)))
+    for index, grams in enumerate(chamberGrams):
+        chamberMatrix[index, [vocabulary[gram] for gram in grams]] = 1
+    bingMatrix = np.zeros((len(bingGrams), len(vocabulary)))
+    for index, grams in enumerate(bingGrams):
+        bingMatrix[index, [vocabulary[gram] for gram in grams]] = 1
+    
+    intersection = chamberMatrix @ bingMatrix.T
+    union = chamberMatrix.sum(axis=1)[:, None] + bingMatrix.sum(axis=1)[None, :] - intersection
+    return intersection / np.maximum(union, 1)
+
+
+def linkToBing(totalLines, bingBusinesses, threshold=0.5, phoneThreshold=0.2):
+    #Returns {row index in totalLines: row position in bingBusinesses}, the header row is skipped.
+    #A shared phone number only needs the names to be loosely similar (phoneThreshold), since one number can belong to
+    #several businesses (e.g. a shared front desk) and a Chamber row can list a number the business no longer has.
+    bingPhones = {}
+    bingBlocks = {}
+    for position, (address, phone) in enumerate(zip(bingBusinesses['Address'], bingBusinesses['Phone Number'])):
+        phone = normalizePhone(phone)
+        if phone:
+            bingPhones.setdefault(phone, []).append(position)
+        key = blockKey(address)
+        if key:
+            bingBlocks.setdefault(key, []).append(position)
+    
+    def bestMatches(groups, bingGroups, minimum):
+        #The most similar Bing business of the group for every row, if it is similar enough.
+        matches = {}
+        for key, indexes in groups.items():
+            candidates = bingGroups[key]
+            similarity = nameSimilarity([totalLines[index][1] for index in indexes], bingBusinesses['Name'].iloc[candidates])
+            best = similarity.argmax(axis=1)
+            for index, bestCandidate, score in zip(indexes, best, similarity.max(axis=1)):
+                if score >= minimum:
+                    matches[index] = candidates[bestCandidate]
+        return matches
+    
+    chamberPhones = {}
+    for index, row in enumerate(totalLines):
+        if index == 0:
+            continue
+        phone = normalizePhone(row[6])
+        if phone in bingPhones:
+            chamberPhones.setdefault(phone, []).append(index)
+    matches = bestMatches(chamberPhones, bingPhones, phoneThreshold)
+    
+    #Rows without a phone match are compared by name inside their block.
+    chamberBlocks = {}
+    for index, row in enumerate(totalLines):
+        if index == 0 or index in matches:
+            continue
+        key = blockKey(row[3])
+        if key in bingBlocks:
+            chamberBlocks.setdefault(key, []).append(index)
+    matches.update(bestMatches(chamberBlocks, bingBlocks, threshold))
+    
+    return matches
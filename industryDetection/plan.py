@@ -0,0 +1,57 @@
+"""
+Compiles what to crawl (regions, types and a grid strategy) into the canonical list of Bing requests, before any
+request is sent. Types listed more than once (DiscountStores and LiquorStores are both EatDrink and Shop types) and
+identical cells (e.g. the same region given twice) are only requested once, and the plan is sorted so the same inputs
+always give the same requests in the same order. Regions are not clipped against each other, so where two different
+regions overlap, the overlap is requested once for each of them.
+
+describePlan is the dry run: how many calls the plan makes, how long it takes at the provider's rate, and how much
+of the yearly Bing quota it uses.
+"""
+
+from .businessTypes import totalTypes
+from .crawl import metaBoundingBoxSW, metaBoundingBoxNE, LAT_divisor, LNG_divisor, crawlJobs, circularJobs
+from .fetchEngine import BingLocalSearch
+
+#Region name -> (Southwest corner, Northeast corner)
+defaultRegions = {"Sunnyvale": (metaBoundingBoxSW, metaBoundingBoxNE)}
+
+
+def compilePlan(regions=defaultRegions, types=totalTypes, grid="rect", LAT_divisor=LAT_divisor, LNG_divisor=LNG_divisor, radius=1500, densityTiles=None):
+    #grid is "rect" (LAT_divisor rows by LNG_divisor columns per region) or "hex" (circles of radius meters, or sized
+    #by densityTiles). Returns the jobs crawl() takes.
+    if grid not in ("rect", "hex"):
+        raise ValueError("grid must be rect or hex")
+    for name, (SW, NE) in regions.items():
+        if not (SW[0] < NE[0] and SW[1] < NE[1]):
+            raise ValueError("region " + name + " needs its Southwest corner south and west of its Northeast corner")
+    types = list(dict.fromkeys(types))
+    
+    jobs = set()
+    for SW, NE in regions.values():
+        if grid == "rect":
+            jobs.update(crawlJobs(types, SW, NE, LAT_divisor, LNG_divisor))
+        else:
+            jobs.update(circularJobs(types, SW, NE, radius, densityTiles))
+    
+    #Grouped by type, in the order the types were given, then by query.
+    typeOrder = {bizType: index for index, bizType in enumerate(types)}
+    return sorted(jobs, key=lambda job: (typeOrder[job[0]], job[1:]))
+
+
+def describePlan(jobs, provider=BingLocalSearch):
+    calls = len(jobs)
+    seconds = calls / provider.requestsPerSecond
+    return {
+        "calls": calls,
+        "types": len({job[0] for job in jobs}),
+        "estimatedSeconds": seconds,
+        "annualQuotaShare": calls / provider.annualQuota
+    }
+
+
+def printPlan(jobs, provider=BingLocalSearch):
+    description = describePlan(jobs, provider)
+    print(str(description["calls"]) + " requests over " + str(description["types"]) + " types")
+    print("Estimated runtime: " + str(round(description["estimatedSeconds"] / 60, 1)) + " minutes at " + str(provider.requestsPerSecond) + " requests a second")
+    print("Share of the yearly quota of " + str(provider.annualQuota) + ": " + str(round(description["annualQuotaShare"] * 100, 2)) + "%")
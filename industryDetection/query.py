@@ -0,0 +1,228 @@
+"""
+In-memory spatial queries over the deduplicated businesses, e.g. "which cafes are within 500m of this address" or
+"all shops in this box", without re-reading CleanedBusinessList.csv for every question.
+
+The businesses are loaded once into a uniform grid of cellSize meter buckets (a city is small enough that a grid does
+the job of a KD-tree), plus one inverted index per type and per overall type. Radius, box and nearest queries only
+look at the buckets they overlap, and filter by type with the inverted index, so they stay well under a millisecond.
+
+BusinessService wraps the index, reloading it whenever a new crawl lands in the dataset, and serve() puts it behind
+a small aiohttp server.
+"""
+
+import math
+import os
+import time
+
+from .crawl import metersPerDegreeLAT
+from .dedupe import cleanedColumns, loadBusinesses
+
+
+def checkPoint(lat, lng):
+    if not (math.isfinite(lat) and math.isfinite(lng)) or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("latitude must be within -90 to 90 and longitude within -180 to 180")
+
+
+class BusinessIndex:
+    def __init__(self, df, cellSize=250):
+        import numpy as np
+
+        #Businesses that could not be mapped sit at (0, 0).
+        df = df[(df['Latitude'] != 0) | (df['Longitude'] != 0)].reset_index(drop=True)
+        self.businesses = df[cleanedColumns].to_dict("records")
+        self.cellSize = cellSize
+
+        #Flat projection in meters around the middle of the data, accurate enough at city scale.
+        self.originLAT = float(df['Latitude'].mean()) if len(df) else 0.0
+        self.metersPerDegreeLNG = metersPerDegreeLAT * math.cos(math.radians(self.originLAT))
+        self.y = df['Latitude'].to_numpy(dtype=float) * metersPerDegreeLAT
+        self.x = df['Longitude'].to_numpy(dtype=float) * self.metersPerDegreeLNG
+
+        #Every bucket is a slice of self.order, the businesses sorted by bucket.
+        rows = np.floor(self.y / cellSize).astype(np.int64)
+        columns = np.floor(self.x / cellSize).astype(np.int64)
+        self.order = np.lexsort((columns, rows))
+        self.buckets = {}
+        for position, index in enumerate(self.order):
+            key = (rows[index], columns[index])
+            start, end = self.buckets.get(key, (position, position))
+            self.buckets[key] = (start, position + 1)
+        #The occupied buckets, so a query never walks the empty grid around the data.
+        if self.buckets:
+            self.rowRange = (int(rows.min()), int(rows.max()))
+            self.columnRange = (int(columns.min()), int(columns.max()))
+
+        #Inverted indexes, from every type and overall type to a mask over the businesses.
+        self.typeMasks = {}
+        for index, (overallType, bizTypes) in enumerate(zip(df['Overall Type'], df['Type'])):
+            for bizType in [overallType] + bizTypes.split(', '):
+                if bizType not in self.typeMasks:
+                    self.typeMasks[bizType] = np.zeros(len(df), dtype=bool)
+                self.typeMasks[bizType][index] = True
+
+    @classmethod
+    def fromDataset(cls, path='CleanedBusinessList', crawlDate=None, cellSize=250):
+        return cls(loadBusinesses(cleanedColumns, crawlDate, path), cellSize)
+
+    def candidates(self, yMin, yMax, xMin, xMax, bizType=None):
+        #Businesses in every bucket overlapping the rectangle, narrowed down to bizType.
+        import numpy as np
+
+        slices = []
+        if self.buckets:
+            #Clamped to the occupied buckets, and if the rectangle still spans more buckets than exist, the existing
+            #buckets are checked instead, so the cost never grows past the size of the data.
+            rowStart = max(math.floor(yMin / self.cellSize), self.rowRange[0])
+            rowEnd = min(math.floor(yMax / self.cellSize), self.rowRange[1])
+            columnStart = max(math.floor(xMin / self.cellSize), self.columnRange[0])
+            columnEnd = min(math.floor(xMax / self.cellSize), self.columnRange[1])
+            if rowStart <= rowEnd and columnStart <= columnEnd:
+                if (rowEnd - rowStart + 1) * (columnEnd - columnStart + 1) > len(self.buckets):
+                    for (row, column), (start, end) in self.buckets.items():
+                        if rowStart <= row <= rowEnd and columnStart <= column <= columnEnd:
+                            slices.append(self.order[start:end])
+                else:
+                    for row in range(rowStart, rowEnd + 1):
+                        for column in range(columnStart, columnEnd + 1):
+                            if (row, column) in self.buckets:
+                                start, end = self.buckets[(row, column)]
+                                slices.append(self.order[start:end])
+        found = np.concatenate(slices) if slices else np.zeros(0, dtype=np.int64)
+
+        if bizType is not None:
+            if bizType not in self.typeMasks:
+                return found[:0]
+            found = found[self.typeMasks[bizType][found]]
+        return found
+
+    def results(self, found, distances=None):
+        if distances is None:
+            return [dict(self.businesses[index]) for index in found]
+        return [dict(self.businesses[index], Distance=float(distance)) for index, distance in zip(found, distances)]
+
+    def radius(self, lat, lng, meters, bizType=None):
+        #Every business within meters of the point, closest first.
+        import numpy as np
+
+        checkPoint(lat, lng)
+        if not math.isfinite(meters) or meters < 0:
+            raise ValueError("meters must be a finite, non-negative number")
+        y = lat * metersPerDegreeLAT
+        x = lng * self.metersPerDegreeLNG
+        found = self.candidates(y - meters, y + meters, x - meters, x + meters, bizType)
+        distances = np.hypot(self.y[found] - y, self.x[found] - x)
+        inside = distances <= meters
+        found, distances = found[inside], distances[inside]
+        closest = np.argsort(distances, kind="stable")
+        return self.results(found[closest], distances[closest])
+
+    def box(self, SW, NE, bizType=None):
+        #Every business inside the box, SW and NE being (latitude, longitude) corners.
+        checkPoint(*SW)
+        checkPoint(*NE)
+        yMin, yMax = SW[0] * metersPerDegreeLAT, NE[0] * metersPerDegreeLAT
+        xMin, xMax = SW[1] * self.metersPerDegreeLNG, NE[1] * self.metersPerDegreeLNG
+        found = self.candidates(yMin, yMax, xMin, xMax, bizType)
+        inside = (self.y[found] >= yMin) & (self.y[found] <= yMax) & (self.x[found] >= xMin) & (self.x[found] <= xMax)
+        return self.results(sorted(found[inside]))
+
+    def nearest(self, lat, lng, k=5, bizType=None):
+        #The k businesses closest to the point. The search square grows one bucket at a time until the k-th closest
+        #business found is nearer than anything outside the square could be.
+        import numpy as np
+
+        checkPoint(lat, lng)
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        y = lat * metersPerDegreeLAT
+        x = lng * self.metersPerDegreeLNG
+        total = len(self.businesses) if bizType is None else int(self.typeMasks.get(bizType, np.zeros(0)).sum())
+        k = min(k, total)
+        if k == 0:
+            return []
+
+        #Starts at the edge of the occupied buckets when the point is outside them. Once the square covers all of
+        #them every business is a candidate and the search ends, so it never grows past the data.
+        yLow, yHigh = self.rowRange[0] * self.cellSize, (self.rowRange[1] + 1) * self.cellSize
+        xLow, xHigh = self.columnRange[0] * self.cellSize, (self.columnRange[1] + 1) * self.cellSize
+        reach = max(self.cellSize, yLow - y, y - yHigh, xLow - x, x - xHigh)
+        while True:
+            found = self.candidates(y - reach, y + reach, x - reach, x + reach, bizType)
+            if len(found) >= k:
+                distances = np.hypot(self.y[found] - y, self.x[found] - x)
+                closest = np.argsort(distances, kind="stable")[:k]
+                if distances[closest[-1]] <= reach or len(found) == total:
+                    return self.results(found[closest], distances[closest])
+            reach *= 2
+
+
+class BusinessService:
+    #Keeps a BusinessIndex of the newest crawl in the dataset, checking for a new crawl at most every checkInterval
+    #seconds, so callers can hold on to one service while crawls land underneath it.
+    def __init__(self, path='CleanedBusinessList', cellSize=250, checkInterval=1.0):
+        self.path = path
+        self.cellSize = cellSize
+        self.checkInterval = checkInterval
+        self.lastCheck = 0
+        self.version = None
+        self.index = None
+        self.refresh()
+
+    def datasetVersion(self):
+        #The newest modification time of anything in the dataset, which changes whenever the dedupe stage writes it.
+        newest = os.path.getmtime(self.path)
+        for root, directories, files in os.walk(self.path):
+            for name in directories + files:
+                newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+        return newest
+
+    def refresh(self):
+        now = time.monotonic()
+        if self.index is not None and now - self.lastCheck < self.checkInterval:
+            return False
+        self.lastCheck = now
+
+        version = self.datasetVersion()
+        if version == self.version:
+            return False
+        #Built first and then swapped in, so queries never see a half-loaded index.
+        self.index = BusinessIndex.fromDataset(self.path, cellSize=self.cellSize)
+        self.version = version
+        return True
+
+    def radius(self, lat, lng, meters, bizType=None):
+        self.refresh()
+        return self.index.radius(lat, lng, meters, bizType)
+
+    def box(self, SW, NE, bizType=None):
+        self.refresh()
+        return self.index.box(SW, NE, bizType)
+
+    def nearest(self, lat, lng, k=5, bizType=None):
+        self.refresh()
+        return self.index.nearest(lat, lng, k, bizType)
+
+
+def serve(path='CleanedBusinessList', host="127.0.0.1", port=8080):
+    #GET /radius?lat=&lng=&meters=&type=
+    #GET /box?swLat=&swLng=&neLat=&neLng=&type=
+    #GET /nearest?lat=&lng=&k=&type=
+    #type is optional everywhere and can be a type (e.g. CoffeeAndTea) or an overall type (e.g. EatDrink).
+    from aiohttp import web
+
+    service = BusinessService(path)
+
+    def answer(query):
+        async def handler(request):
+            try:
+                results = query(request.query)
+            except (KeyError, ValueError, OverflowError) as error:
+                return web.json_response({"error": "bad parameter " + str(error)}, status=400)
+            return web.json_response({"count": len(results), "results": results})
+        return handler
+
+    app = web.Application()
+    app.router.add_get("/radius", answer(lambda query: service.radius(float(query["lat"]), float(query["lng"]), float(query["meters"]), query.get("type"))))
+    app.router.add_get("/box", answer(lambda query: service.box((float(query["swLat"]), float(query["swLng"])), (float(query["neLat"]), float(query["neLng"])), query.get("type"))))
+    app.router.add_get("/nearest", answer(lambda query: service.nearest(float(query["lat"]), float(query["lng"]), int(query.get("k", 5)), query.get("type"))))
+    web.run_app(app, host=host, port=port)
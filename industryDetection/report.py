@@ -0,0 +1,148 @@
+"""
+Report stage: the charts of the most common types of businesses in Sunnyvale, rendered headlessly to PNG/SVG.
+
+The data is loaded once and every count is computed in one vectorized pass (computeAggregates). What each chart
+shows is described in charts, with the thresholds, excluded types and display labels written out by type name, so
+the charts no longer depend on where a type happens to land in a list. The charts are then drawn in parallel, one
+process per chart, with the Agg backend so the report also runs unattended without a display.
+"""
+
+import os
+import re
+
+from .businessTypes import eatDrinkTypes, seeDoTypes, shopTypes
+from .dedupe import loadBusinesses
+
+charts = {
+    "OverallTypes": {
+        "kind": "pie",
+        #Every slice is the sum of the overall types listed for it.
+        "slices": {
+            "Retail": ["Shop"],
+            "Restaurants/Bars": ["EatDrink"],
+            "Activities": ["SeeDo"],
+            "Misc": ["Hospitals", "HotelsAndMotels", "Parking", "BanksAndCreditUnions"]
+        },
+        "explode": (0.1, 0.1, 0, 0)
+    },
+    #The bar chart thresholds are the ones the notebook used, which only counted businesses listed under several types
+    #("counts": "multiType"), so they keep counting the same way. "exclude" names every bar the notebook removed,
+    #including the ones it deleted by their position in the list.
+    "RestaurantStyles": {
+        "kind": "bar",
+        "overallType": "EatDrink",
+        "types": eatDrinkTypes,
+        "counts": "multiType",
+        "minimum": 50,
+        #Catch-all categories, bars and stores, which are not restaurant styles. Deleting by name skipped the entry
+        #after every deleted one, which is how BreweriesAndBrewPubs and Grocery got through to the positional deletes,
+        #next to Supermarkets, Taverns and the store between Cafe and Fast Food.
+        "exclude": ["Restaurants", "Grocers", "Grocery", "Supermarkets", "SportsBars", "BarsGrillsAndPubs", "BreweriesAndBrewPubs", "Taverns", "DeliveryService", "DiscountStores"],
+        "labels": {"CafeRestaurants": "Cafe", "FastFood": "Fast Food", "JapaneseRestaurants": "Japanese", "MexicanRestaurants": "Mexican"},
+        "xlabel": "Restaurant Styles",
+        "title": "Most popular Restaurant Styles in Sunnyvale"
+    },
+    "Activities": {
+        "kind": "bar",
+        "overallType": "SeeDo",
+        "types": seeDoTypes,
+        "counts": "multiType",
+        "minimum": 10,
+        #The catch-all right after Amusement Parks.
+        "exclude": ["Attractions"],
+        "labels": {},
+        "xlabel": "Things To Do In Sunnyvale",
+        "title": "Activity"
+    },
+    "ShopTypes": {
+        "kind": "bar",
+        "overallType": "Shop",
+        "types": shopTypes,
+        "counts": "multiType",
+        "minimum": 20,
+        #A place full of shops rather than a kind of shop.
+        "exclude": ["MallsAndShoppingCenters"],
+        "labels": {},
+        "xlabel": "Most Popular Shops In Sunnyvale",
+        "title": "Shop Type"
+    }
+}
+
+
+def typeCounts(df):
+    #{overall type: {type: count}}, counting a business once for every type it was listed under.
+    typeRows = df.assign(Type=df['Type'].str.split(', ')).explode('Type')
+    counts = {}
+    for (overallType, bizType), count in typeRows.groupby(['Overall Type', 'Type']).size().items():
+        counts.setdefault(overallType, {})[bizType] = int(count)
+    return counts
+
+
+def computeAggregates(df):
+    #"types" counts every business, "multiTypeTypes" only the businesses listed under several types, like the
+    #notebook's charts did.
+    return {
+        "overall": {overallType: int(count) for overallType, count in df['Overall Type'].value_counts().items()},
+        "types": typeCounts(df),
+        "multiTypeTypes": typeCounts(df[df['Type'].str.contains(',', regex=False)])
+    }
+
+
+def displayLabel(spec, bizType):
+    #"AmusementParks" -> "Amusement Parks", unless the chart has its own label for the type.
+    return spec.get("labels", {}).get(bizType, re.sub(r"(?<=[a-z])(?=[A-Z])", " ", bizType))
+
+
+def chartData(spec, aggregates):
+    #The (labels, values) a chart draws, after its rules are applied.
+    if spec["kind"] == "pie":
+        labels = list(spec["slices"])
+        values = [sum(aggregates["overall"].get(overallType, 0) for overallType in overallTypes) for overallTypes in spec["slices"].values()]
+        return labels, values
+
+    counts = aggregates["multiTypeTypes" if spec.get("counts") == "multiType" else "types"].get(spec["overallType"], {})
+    kept = [bizType for bizType in spec["types"] if counts.get(bizType, 0) > spec["minimum"] and bizType not in spec["exclude"]]
+    return [displayLabel(spec, bizType) for bizType in kept], [counts[bizType] for bizType in kept]
+
+
+def drawChart(plt, spec, data):
+    labels, values = data
+    fig, ax = plt.subplots()
+
+    if spec["kind"] == "pie":
+        ax.pie(values, explode=spec["explode"], labels=labels, autopct='%1.1f%%',
+               shadow=True, startangle=90)
+        ax.axis('equal')
+    else:
+        ax.bar(labels, values, width = 0.4)
+        ax.set_xlabel(spec["xlabel"])
+        ax.set_ylabel("No. in Sunnyvale")
+        ax.set_title(spec["title"])
+    return fig
+
+
+def renderChart(name, spec, data, outputDir, formats):
+    #Runs in its own process, so the backend is picked here before pyplot is imported.
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig = drawChart(plt, spec, data)
+    paths = []
+    for extension in formats:
+        paths.append(os.path.join(outputDir, name + "." + extension))
+        fig.savefig(paths[-1], bbox_inches="tight")
+    plt.close(fig)
+    return paths
+
+
+def report(datasetPath='CleanedBusinessList', outputDir='.', formats=("png",), workers=None):
+    from concurrent.futures import ProcessPoolExecutor
+
+    df = loadBusinesses(['Overall Type', 'Type'], path=datasetPath)
+    aggregates = computeAggregates(df)
+
+    os.makedirs(outputDir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers or len(charts)) as pool:
+        rendered = [pool.submit(renderChart, name, spec, chartData(spec, aggregates), outputDir, formats) for name, spec in charts.items()]
+        return [path for chart in rendered for path in chart.result()]
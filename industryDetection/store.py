@@ -0,0 +1,186 @@
+"""
+Embedded SQLite store for everything the stages hand to each other, so a new crawl or a few new enrichments are
+upserted in place instead of every file being rewritten and re-read.
+
+Tables:
+    - rawResponses: the Bing response for every (bizType, query, mapView) request.
+    - businesses: one row per business, identified the same way the dedupe stage groups them (overall type, name,
+      address, phone number, website and coordinates). Indexed on (latitude, longitude) and normalizedPhone.
+    - businessTypes: every type each business was found under. Indexed on type.
+    - googleEnrichments: the Google (or Bing, see linkage) answer for every Chamber spreadsheet business.
+
+A store file can stand in for the CleanedBusinessList dataset: loadBusinesses reads the newest crawl out of it, so
+tiles, report, serve and enrich can all run straight off a store that crawl --store keeps up to date, without the
+parse and dedupe stages rewriting the CSV and Parquet files in between.
+"""
+
+import sqlite3
+import time
+from itertools import islice
+
+from .dedupe import cleanedColumns
+from .linkage import normalizePhone
+from .transform import businessRows, chunkSize
+
+schema = """
+CREATE TABLE IF NOT EXISTS rawResponses (
+    bizType TEXT NOT NULL,
+    query TEXT NOT NULL,
+    mapView TEXT NOT NULL,
+    body TEXT NOT NULL,
+    fetchedAt REAL NOT NULL,
+    PRIMARY KEY (bizType, query, mapView)
+);
+CREATE TABLE IF NOT EXISTS businesses (
+    id INTEGER PRIMARY KEY,
+    overallType TEXT NOT NULL,
+    name TEXT NOT NULL,
+    address TEXT NOT NULL,
+    phoneNumber TEXT NOT NULL,
+    website TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    normalizedPhone TEXT NOT NULL,
+    updatedAt REAL NOT NULL,
+    UNIQUE (overallType, name, address, phoneNumber, website, latitude, longitude)
+);
+CREATE INDEX IF NOT EXISTS businessesLocation ON businesses (latitude, longitude);
+CREATE INDEX IF NOT EXISTS businessesPhone ON businesses (normalizedPhone);
+CREATE TABLE IF NOT EXISTS businessTypes (
+    businessId INTEGER NOT NULL REFERENCES businesses (id),
+    type TEXT NOT NULL,
+    PRIMARY KEY (businessId, type)
+);
+CREATE INDEX IF NOT EXISTS businessTypesType ON businessTypes (type);
+CREATE TABLE IF NOT EXISTS googleEnrichments (
+    chamberName TEXT NOT NULL,
+    chamberAddress TEXT NOT NULL,
+    chamberPhone TEXT NOT NULL,
+    placeId TEXT NOT NULL,
+    placeName TEXT NOT NULL,
+    placeTypes TEXT NOT NULL,
+    longitude TEXT NOT NULL,
+    latitude TEXT NOT NULL,
+    source TEXT NOT NULL,
+    updatedAt REAL NOT NULL,
+    PRIMARY KEY (chamberName, chamberAddress, chamberPhone)
+);
+"""
+
+businessKey = "overallType = ? AND name = ? AND address = ? AND phoneNumber = ? AND website = ? AND latitude = ? AND longitude = ?"
+
+
+class BusinessStore:
+    def __init__(self, path='Businesses.sqlite'):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def upsertLines(self, lines, now=None):
+        #Upserts the businesses of a batch of {JSON_RESULT}|BusinessType lines, and the types they were found under.
+        #Every batch of one crawl shares the same now, which is how businessTable tells the newest crawl apart.
+        businesses = []
+        memberships = []
+        if now is None:
+            now = time.time()
+        for overallType, bizType, name, address, phone, website, latitude, longitude in businessRows(lines):
+            #Missing values are stored as "" so they still take part in the uniqueness of a business.
+            key = (overallType, name or "", address or "", phone or "", website or "", latitude, longitude)
+            businesses.append(key + (normalizePhone(phone or ""), now))
+            memberships.append((bizType,) + key)
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO businesses (overallType, name, address, phoneNumber, website, latitude, longitude, normalizedPhone, updatedAt) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (overallType, name, address, phoneNumber, website, latitude, longitude) DO UPDATE SET updatedAt = excluded.updatedAt",
+                businesses)
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO businessTypes (businessId, type) SELECT id, ? FROM businesses WHERE " + businessKey,
+                memberships)
+        return len(businesses)
+
+    def upsertCrawl(self, jobs, results):
+        #jobs and the (outcome, line) results of crawling them, in the same order.
+        now = time.time()
+        lines = []
+        responses = []
+        for job, (outcome, line) in zip(jobs, results):
+            if outcome != "ok":
+                continue
+            lines.append(line)
+            bizType, stringifiedQuery = job[:2]
+            mapView = job[2] if len(job) > 2 else "userMapView"
+            responses.append((bizType, stringifiedQuery, mapView, line[:-(len(bizType) + 1)], now))
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO rawResponses (bizType, query, mapView, body, fetchedAt) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (bizType, query, mapView) DO UPDATE SET body = excluded.body, fetchedAt = excluded.fetchedAt",
+                responses)
+        for start in range(0, len(lines), chunkSize):
+            self.upsertLines(lines[start:start + chunkSize], now)
+        return len(responses)
+
+    def importResults(self, resultsPath='ResultsList.txt'):
+        #Loads the businesses of an existing ResultsList.txt. The raw lines do not record the query they came from,
+        #so rawResponses is left alone.
+        businesses = 0
+        now = time.time()
+        with open(resultsPath, "r", encoding="utf-8") as newFile:
+            while True:
+                lines = list(islice(newFile, chunkSize))
+                if not lines:
+                    break
+                businesses += self.upsertLines(lines, now)
+        return businesses
+
+    def upsertEnrichment(self, chamberName, chamberAddress, chamberPhone, businessInfo, source="google"):
+        #businessInfo is what placeReq returns: place ID, name, types, longitude, latitude.
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO googleEnrichments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (chamberName, chamberAddress, chamberPhone) DO UPDATE SET placeId = excluded.placeId, "
+                "placeName = excluded.placeName, placeTypes = excluded.placeTypes, longitude = excluded.longitude, "
+                "latitude = excluded.latitude, source = excluded.source, updatedAt = excluded.updatedAt",
+                (chamberName, chamberAddress, chamberPhone, *businessInfo, source, time.time()))
+
+    def enrichment(self, chamberName, chamberAddress, chamberPhone):
+        row = self.connection.execute(
+            "SELECT placeId, placeName, placeTypes, longitude, latitude FROM googleEnrichments "
+            "WHERE chamberName = ? AND chamberAddress = ? AND chamberPhone = ?",
+            (chamberName, chamberAddress, chamberPhone)).fetchone()
+        return list(row) if row else None
+
+    def businesses(self, where="", parameters=()):
+        #Rows shaped like CleanedBusinessList, with every type of a business joined by ", ".
+        return self.connection.execute(
+            "SELECT b.overallType, (SELECT group_concat(type, ', ') FROM businessTypes WHERE businessId = b.id), "
+            "b.name, b.address, b.phoneNumber, b.website, b.latitude, b.longitude FROM businesses b " + where,
+            parameters).fetchall()
+
+    def businessesOfType(self, bizType):
+        return self.businesses("WHERE b.id IN (SELECT businessId FROM businessTypes WHERE type = ?) OR b.overallType = ?", (bizType, bizType))
+
+    def businessesInBox(self, SW, NE):
+        return self.businesses("WHERE b.latitude BETWEEN ? AND ? AND b.longitude BETWEEN ? AND ?", (SW[0], NE[0], SW[1], NE[1]))
+
+    def businessesByPhone(self, phone):
+        return self.businesses("WHERE b.normalizedPhone = ?", (normalizePhone(phone),))
+
+    def businessTable(self, newestCrawl=False):
+        #The store as a DataFrame with the CleanedBusinessList columns. Unlike the dedupe stage it keeps businesses
+        #missing a phone number or website (as ""). By default every crawl ever upserted is in it, with newestCrawl
+        #only the businesses the last crawl (or importResults) found, which is what loadBusinesses reads.
+        import pandas as pd
+
+        where = "WHERE b.updatedAt = (SELECT max(updatedAt) FROM businesses)" if newestCrawl else ""
+        return pd.DataFrame(self.businesses(where), columns=cleanedColumns)
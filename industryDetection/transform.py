@@ -0,0 +1,122 @@
+"""
+Parse stage: turns the raw responses in ResultsList.txt into BusinessList.csv, one row per business per type.
+"""
+
+import csv
+import json
+import os
+import shutil
+from itertools import islice
+
+from .businessTypes import getOverallType
+from .localSearch import extract_columns
+
+businessColumns = ["Overall Type", "Type", "Name", "Address", "Phone Number", "Website", "Latitude", "Longitude"]
+
+
+def splitResultLine(line):
+    #Structure of the line:
+    #{JSON_RESULT}|BusinessType
+    bizType = line.rsplit("|")[-1]
+    line = line[:-(len(bizType) + 1)]
+    
+    #We run this strip() function to remove the newlines, as that's included into the substring.
+    return json.loads(line), bizType.strip()
+
+
+#Both coordinates are pulled out on their own, so a missing point is just two None values.
+businessItems = ("name", "Address.formattedAddress", "PhoneNumber", "Website", "point.coordinates.0", "point.coordinates.1")
+
+#Lines are parsed and written this many at a time.
+chunkSize = 1000
+
+
+def businessRows(lines):
+    #Extracts every business of a batch of lines straight into columns, and zips them back up into rows in the
+    #order of businessColumns.
+    responses = []
+    bizTypes = []
+    for line in lines:
+        data, bizType = splitResultLine(line)
+        responses.append(data)
+        bizTypes.append(bizType)
+    overallTypes = [getOverallType(bizType) for bizType in bizTypes]
+    
+    columns = extract_columns(responses, businessItems, response_index=True)
+    responseIndex = columns['response']
+    #If the location is not able to be mapped as a point, put the latitude and longitude as 0.
+    latitudes = [0 if lat is None else lat for lat in columns["point.coordinates.0"]]
+    longitudes = [0 if lng is None else lng for lng in columns["point.coordinates.1"]]
+    
+    return zip(map(overallTypes.__getitem__, responseIndex), map(bizTypes.__getitem__, responseIndex),
+               columns["name"], columns["Address.formattedAddress"], columns["PhoneNumber"], columns["Website"],
+               latitudes, longitudes)
+
+
+def writeBusinessRows(writer, lines):
+    #The file is written as UTF-8, so accented names (e.g accent et gu e/é) no longer need an encoding fallback.
+    writer.writerows(businessRows(lines))
+
+
+def transform(resultsPath='ResultsList.txt', csvPath='BusinessList.csv'):
+    with open(resultsPath, "r", encoding="utf-8") as newFile, open(csvPath, "w", newline='', encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile, delimiter=",")
+        writer.writerow(businessColumns)
+        while True:
+            lines = list(islice(newFile, chunkSize))
+            if not lines:
+                break
+            writeBusinessRows(writer, lines)
+
+
+#The serial transform parses ResultsList.txt on a single core, which is fine for one crawl but becomes the
+#bottleneck once many crawls (or regions) are appended to the same file. parallelTransform splits the file into
+#byte ranges, one per process, and every process parses the lines that *start* inside its range into its own CSV
+#shard. The shards are then concatenated in range order, so BusinessList.csv comes out byte for byte the same as
+#the serial transform, just built on every core.
+
+def shardRanges(path, shardCount):
+    size = os.path.getsize(path)
+    step = max(1, -(-size // shardCount)) #Ceiling division, so the last shard is never left with a sliver.
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def transformShard(path, start, end, shardPath):
+    with open(path, "rb") as rawFile, open(shardPath, "w", newline='', encoding="utf-8") as shardFile:
+        writer = csv.writer(shardFile, delimiter=",")
+        if start > 0:
+            #Skip the line that straddles the start of the range, the previous shard owns it.
+            rawFile.seek(start - 1)
+            rawFile.readline()
+        lines = []
+        while rawFile.tell() < end:
+            line = rawFile.readline().decode("utf-8")
+            if not line:
+                break
+            lines.append(line)
+            if len(lines) == chunkSize:
+                writeBusinessRows(writer, lines)
+                lines = []
+        if lines:
+            writeBusinessRows(writer, lines)
+    
+    return shardPath
+
+
+def parallelTransform(resultsPath='ResultsList.txt', csvPath='BusinessList.csv', workers=None):
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count()
+    ranges = shardRanges(resultsPath, workers)
+    shardPaths = [csvPath + ".part" + str(index) for index in range(len(ranges))]
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(transformShard, [resultsPath] * len(ranges), [start for start, end in ranges], [end for start, end in ranges], shardPaths))
+    
+    #Merging in range order keeps the output deterministic no matter which worker finishes first.
+    with open(csvPath, "w", newline='', encoding="utf-8") as csvfile:
+        csv.writer(csvfile, delimiter=",").writerow(businessColumns)
+        for shardPath in shardPaths:
+            with open(shardPath, "r", newline='', encoding="utf-8") as shardFile:
+                shutil.copyfileobj(shardFile, csvfile)
+            os.remove(shardPath)